@@ -1,16 +1,27 @@
+from functools import lru_cache
+
 from agent.constants import PREFIXES
 
-class Composer:
-    def compose_one_hop_qa(self, uri, pred, direct):
-        if direct == "forward":
-            return f"{PREFIXES} SELECT ?o ?oLabel WHERE {{ <{uri}> <{pred}> ?o . OPTIONAL {{ ?o rdfs:label ?oLabel . }} }}"
-        return f"{PREFIXES} SELECT ?s ?sLabel WHERE {{ ?s <{pred}> <{uri}> . OPTIONAL {{ ?s rdfs:label ?sLabel . }} }}"
+# Same seeds come up again and again; build each query text once.
+QUERY_CACHE_SIZE = 4096
+# Prefix block on one line, so cached queries are already whitespace-compact
+_PREFIXES = " ".join(PREFIXES.split())
+
 
-    def compose_graph_rec_query(self, seed):
-        return f"""
-            {PREFIXES} SELECT DISTINCT ?movie ?rating WHERE {{
-                {{ <{seed}> wdt:P136 ?g . ?movie wdt:P136 ?g . }} UNION
-                {{ <{seed}> wdt:P57 ?d . ?movie wdt:P57 ?d . }}
-                ?movie wdt:P31 wd:Q11424 . OPTIONAL {{ ?movie ddis:rating ?rating . }}
-            }} LIMIT 50
-        """
\ No newline at end of file
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _graph_rec_query(seed, limit):
+    # DISTINCT/LIMIT in a subquery: the rating join then runs once per kept
+    # movie, not once per shared genre/director row of the UNION.
+    return (
+        f"{_PREFIXES} SELECT ?movie ?rating WHERE {{ "
+        f"{{ SELECT DISTINCT ?movie WHERE {{ "
+        f"{{ <{seed}> wdt:P136 ?g . ?movie wdt:P136 ?g . }} UNION "
+        f"{{ <{seed}> wdt:P57 ?d . ?movie wdt:P57 ?d . }} "
+        f"?movie wdt:P31 wd:Q11424 . }} LIMIT {limit} }} "
+        f"OPTIONAL {{ ?movie ddis:rating ?rating . }} }}"
+    )
+
+
+class Composer:
+    def compose_graph_rec_query(self, seed, *, limit=50):
+        return _graph_rec_query(seed, int(limit))
@@ -14,12 +14,19 @@ class Config:
         self.graph_path = self.data_root / "graph.nt"
         if not self.graph_path.exists(): self.graph_path = self.data_root / "graph.tsv"
 
+        # Persistent Oxigraph store, so restarts skip re-parsing the KG. Opt-in:
+        # only one process can hold it open (see GraphExecutor).
+        store_dir = os.getenv("GRAPH_STORE_DIR")
+        self.graph_store_dir = Path(store_dir) if store_dir else None
+
         self.entity_index_path = self.data_root / "embeddings" / "entity_ids.del"
         self.relation_index_path = self.data_root / "embeddings" / "relation_ids.del"
         
         # RFC Embeddings
         self.entity_embeds_path = self.code_root / "embeddings" / "RFC_entity_embeds.npy"
         self.relation_embeds_path = self.code_root / "embeddings" / "RFC_relation_embeds.npy"
+        # EMBED_QUANTIZER=fp16|int8 keeps the entity index compressed (see EmbeddingExecutor)
+        self.embed_quantizer = os.getenv("EMBED_QUANTIZER") or None
 
         self.images_json_path = self.data_root / "additional" / "images.json"
         
@@ -1,4 +1,5 @@
 import os
+import re
 
 # --- File Paths ---
 DATA_DIR = os.getenv('DATA_DIR', '/space_mounts/atai-hs25/dataset')
@@ -8,6 +9,7 @@ KG_PATH = os.path.join(DATA_DIR, 'graph.nt')
 ENTITY_INDEX_PATH = os.path.join(DATA_DIR, 'embeddings', 'entity_ids.del')
 RELATION_INDEX_PATH = os.path.join(DATA_DIR, 'embeddings', 'relation_ids.del')
 LABEL_INDEX_PATH = os.path.join(CACHE_DIR, 'label_index.pkl')
+MOVIE_INDEX_PATH = os.path.join(CACHE_DIR, 'movie_index.pkl')
 
 # --- SPARQL Prefixes ---
 PREFIXES = """
@@ -71,6 +73,10 @@ PREDICATE_MAP = {
     "part of series": "http://www.wikidata.org/prop/direct/P179",
 }
 
+# (phrase, predicate IRI) pairs, longest phrase first; sorted once at import.
+# Stable sort, so equal-length phrases keep PREDICATE_MAP order.
+PREDICATE_MAP_SORTED = tuple(sorted(PREDICATE_MAP.items(), key=lambda kv: -len(kv[0])))
+
 # --- INTENT PARSING ---
 RECOMMENDATION_KEYWORDS = [
     "recommend", "suggest", "give me", "find me", "looking for",
@@ -95,4 +101,15 @@ SUPPORTED_LANGUAGES_REGEX = r'\b(French|German|Spanish|English|Italian|Japanese|
 
 MULTIMEDIA_KEYWORDS = [
     "show", "picture", "image", "photo", "look like", "poster", "cover", "see"
-]
\ No newline at end of file
+]
+
+
+# Compiled keyword alternations: one C-level scan instead of an any() over
+# substrings. Plain substring semantics, same as `any(k in q for k in ...)`.
+def _keyword_re(keywords):
+    return re.compile("|".join(map(re.escape, keywords)))
+
+
+RECOMMENDATION_RE = _keyword_re(RECOMMENDATION_KEYWORDS)
+MULTIMEDIA_RE = _keyword_re(MULTIMEDIA_KEYWORDS)
+FOLLOW_UP_RE = _keyword_re(FOLLOW_UP_KEYWORDS)
@@ -1,53 +1,123 @@
+import csv
 import logging
+import os
+import threading
+from collections import OrderedDict
 import numpy as np
+import pandas as pd
 import faiss
 from pathlib import Path
 from typing import List, Tuple, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+# Embeddings are fixed after load, so an entity's top-k list (and a
+# head/relation's predicted tails) never changes; popular lookups are
+# served from here instead of re-scanning the index.
+NEIGHBOR_CACHE_SIZE = 4096
+# Rows per float32 chunk copied from the mapped .npy into the index at load
+LOAD_CHUNK_ROWS = 65536
+# Compact index encodings (faiss scalar quantizers) selectable at load
+QUANTIZERS = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+# faiss-cpu's OpenMP (libgomp) thread pool does not survive fork(). Once the
+# parent has run a threaded faiss call (normalize_L2 at load does), a search
+# in a forked child (PRELOAD_COMPONENTS in app.main) never returns. Children
+# search single-threaded instead.
+os.register_at_fork(after_in_child=lambda: faiss.omp_set_num_threads(1))
+
+
+def _read_id_map(path) -> Tuple[np.ndarray, List[str]]:
+    """Parse a tab-separated `<int id>\t<uri>` file with pandas' C reader; malformed lines are skipped."""
+    df = pd.read_csv(
+        path, sep="\t", header=None, usecols=[0, 1], names=["idx", "uri"],
+        dtype=str, quoting=csv.QUOTE_NONE, keep_default_na=False, engine="c",
+    )
+    idx = pd.to_numeric(df["idx"].str.strip(), errors="coerce")
+    uri = df["uri"].str.strip()
+    keep = idx.notna() & (uri != "")
+    return idx[keep].to_numpy(np.int64), uri[keep].tolist()
+
+
 class EmbeddingExecutor:
-    def __init__(self, ent_emb_path, ent_id_path, rel_emb_path, rel_id_path):
+    def __init__(self, ent_emb_path, ent_id_path, rel_emb_path, rel_id_path, quantizer=None):
+        """
+        quantizer: None for a float32 index, or a QUANTIZERS key to store the
+        entity vectors compressed, cutting index memory and the bytes each
+        search scans: "fp16" halves them (scores shift by ~1e-4), "int8"
+        quarters them (per-dimension 8-bit, scores shift by ~1e-2). Either
+        can swap near-ties.
+        """
+        if quantizer is not None and quantizer not in QUANTIZERS:
+            raise ValueError(f"Unknown embedding quantizer: {quantizer!r}")
+        self.quantizer = quantizer
         self.entity_embeds = None
         self.relation_embeds = None
         self.entity_id_map = {} 
         self.index_to_uri = []
         self.relation_id_map = {}
         self.faiss_index = None
+        self._nn_cache: "OrderedDict[Tuple[str, int], Tuple[Tuple[str, float], ...]]" = OrderedDict()
+        # (head, relation, k) -> predict_tail result, same policy as _nn_cache
+        self._tail_cache: "OrderedDict[Tuple[str, str, int], Tuple[Tuple[str, float], ...]]" = OrderedDict()
+        self._nn_lock = threading.Lock()
         
         self._load_data(ent_emb_path, ent_id_path, rel_emb_path, rel_id_path)
 
     def _load_data(self, ent_emb_path, ent_id_path, rel_emb_path, rel_id_path):
         try:
             # Load Entity Map
-            with open(ent_id_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    p = line.strip().split("\t")
-                    if len(p) >= 2:
-                        idx = int(p[0])
-                        uri = p[1]
-                        self.entity_id_map[uri] = idx
-                        if len(self.index_to_uri) <= idx:
-                            self.index_to_uri.extend([""] * (idx + 1 - len(self.index_to_uri)))
-                        self.index_to_uri[idx] = uri
+            ids, uris = _read_id_map(ent_id_path)
+            self.entity_id_map = dict(zip(uris, ids.tolist()))
+            if len(ids):
+                index_to_uri = np.full(int(ids.max()) + 1, "", dtype=object)
+                index_to_uri[ids] = uris
+                self.index_to_uri = index_to_uri.tolist()
             
             # Load Relation Map
-            with open(rel_id_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    p = line.strip().split("\t")
-                    if len(p) >= 2:
-                        self.relation_id_map[p[1]] = int(p[0])
+            ids, uris = _read_id_map(rel_id_path)
+            self.relation_id_map = dict(zip(uris, ids.tolist()))
 
             # Load Embeddings
             if ent_emb_path.exists():
-                self.entity_embeds = np.load(ent_emb_path)
-                self.relation_embeds = np.load(rel_emb_path)
+                # Mapped, not read: rows are copied into the index chunk by chunk
+                entity_embeds = np.load(ent_emb_path, mmap_mode="r")
+                # Only single rows are read per query; let the OS page them in
+                self.relation_embeds = np.load(rel_emb_path, mmap_mode="r")
                 
                 # Build FAISS
-                d = self.entity_embeds.shape[1]
-                self.faiss_index = faiss.IndexFlatIP(d) # Cosine if normalized
-                faiss.normalize_L2(self.entity_embeds)
-                self.faiss_index.add(self.entity_embeds)
+                d = entity_embeds.shape[1]
+                if self.quantizer:
+                    self.faiss_index = faiss.IndexScalarQuantizer(
+                        d, QUANTIZERS[self.quantizer], faiss.METRIC_INNER_PRODUCT)
+                    if not self.faiss_index.is_trained:
+                        # 8-bit ranges come from an evenly strided sample
+                        step = max(1, entity_embeds.shape[0] // LOAD_CHUNK_ROWS)
+                        sample = np.array(entity_embeds[::step], dtype=np.float32)
+                        faiss.normalize_L2(sample)
+                        self.faiss_index.train(sample)
+                        del sample
+                else:
+                    self.faiss_index = faiss.IndexFlatIP(d) # Cosine if normalized
+                # Normalize in place per chunk, so peak memory is the index
+                # plus one chunk rather than two full copies of the matrix.
+                for start in range(0, entity_embeds.shape[0], LOAD_CHUNK_ROWS):
+                    chunk = np.array(entity_embeds[start:start + LOAD_CHUNK_ROWS], dtype=np.float32)
+                    faiss.normalize_L2(chunk)
+                    self.faiss_index.add(chunk)
+                # The index keeps its own copy of the normalized vectors;
+                # read rows through a view of it instead of holding a second one.
+                # (int8 codes are not plain values; rows are decoded on demand.)
+                n = self.faiss_index.ntotal
+                if self.quantizer == "fp16":
+                    codes = faiss.rev_swig_ptr(self.faiss_index.codes.data(), n * self.faiss_index.code_size)
+                    self.entity_embeds = codes.view(np.float16).reshape(n, d)
+                elif self.quantizer is None:
+                    self.entity_embeds = faiss.rev_swig_ptr(self.faiss_index.get_xb(), n * d).reshape(n, d)
                 logger.info("Embeddings loaded and Index built.")
             else:
                 logger.error("Embedding file missing!")
@@ -55,26 +125,68 @@ class EmbeddingExecutor:
         except Exception as e:
             logger.error(f"Embedding Load Error: {e}")
 
+    def _entity_vectors(self, rows: List[int]) -> np.ndarray:
+        """float32 (len(rows), d) normalized entity vectors, as faiss takes them."""
+        if self.entity_embeds is not None:
+            # A no-op cast for the float32 index
+            return np.asarray(self.entity_embeds[rows], dtype=np.float32)
+        return self.faiss_index.reconstruct_batch(np.asarray(rows, dtype=np.int64))
+
     def get_nearest_neighbors(self, entity_uri: str, k: int = 10) -> List[Tuple[str, float]]:
-        if not self.faiss_index or entity_uri not in self.entity_id_map: return []
-        idx = self.entity_id_map[entity_uri]
-        vec = self.entity_embeds[idx].reshape(1, -1)
-        D, I = self.faiss_index.search(vec, k + 1)
-        
-        res = []
-        for i in range(1, k + 1):
-            n_idx = I[0][i]
-            if n_idx < len(self.index_to_uri):
-                res.append((self.index_to_uri[n_idx], float(D[0][i])))
-        return res
+        return self.get_nearest_neighbors_batch([entity_uri], k).get(entity_uri, [])
+
+    def get_nearest_neighbors_batch(self, entity_uris: List[str], k: int = 10) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        Neighbours for several entities. Cached lists are reused; the rest
+        share one index search (a single GEMM instead of one GEMV per seed).
+        """
+        if not self.faiss_index: return {}
+        uris = [u for u in dict.fromkeys(entity_uris) if u in self.entity_id_map]
+        if not uris: return {}
+
+        found = {}
+        with self._nn_lock:
+            for u in uris:
+                hit = self._nn_cache.get((u, k))
+                if hit is not None:
+                    self._nn_cache.move_to_end((u, k))
+                    found[u] = hit
+        misses = [u for u in uris if u not in found]
+
+        if misses:
+            vecs = self._entity_vectors([self.entity_id_map[u] for u in misses])
+            D, I = self.faiss_index.search(vecs, k + 1)
+            n_uris = len(self.index_to_uri)
+            for uri, dists, idxs in zip(misses, D, I):
+                # Column 0 is the entity itself
+                found[uri] = tuple(
+                    (self.index_to_uri[n_idx], float(dist))
+                    for n_idx, dist in zip(idxs[1:], dists[1:])
+                    if n_idx < n_uris
+                )
+            with self._nn_lock:
+                for u in misses:
+                    self._nn_cache[(u, k)] = found[u]
+                while len(self._nn_cache) > NEIGHBOR_CACHE_SIZE:
+                    self._nn_cache.popitem(last=False)
+
+        return {u: list(found[u]) for u in uris}
 
     def predict_tail(self, head_uri, rel_uri, k=1):
+        if not self.faiss_index: return []
         if head_uri not in self.entity_id_map or rel_uri not in self.relation_id_map:
             return []
+        key = (head_uri, rel_uri, k)
+        with self._nn_lock:
+            hit = self._tail_cache.get(key)
+            if hit is not None:
+                self._tail_cache.move_to_end(key)
+                return list(hit)
         
-        h = self.entity_embeds[self.entity_id_map[head_uri]]
+        h = self._entity_vectors([self.entity_id_map[head_uri]])[0]
         r = self.relation_embeds[self.relation_id_map[rel_uri]]
-        target = (h + r).reshape(1, -1)
+        # One float32 C-contiguous buffer that faiss can normalize and search in place
+        target = np.add(h, r, dtype=np.float32).reshape(1, -1)
         faiss.normalize_L2(target)
         
         D, I = self.faiss_index.search(target, k)
@@ -83,4 +195,8 @@ class EmbeddingExecutor:
             idx = I[0][i]
             if idx < len(self.index_to_uri):
                 res.append((self.index_to_uri[idx], float(D[0][i])))
+        with self._nn_lock:
+            self._tail_cache[key] = tuple(res)
+            while len(self._tail_cache) > NEIGHBOR_CACHE_SIZE:
+                self._tail_cache.popitem(last=False)
         return res
\ No newline at end of file
@@ -1,23 +1,30 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List, Dict, Set, Tuple
+from typing import List, Dict, Optional, Set, Tuple
 import pickle
 import logging
 import os 
 import re
 import json
+import sys
+from functools import lru_cache
 from pathlib import Path
 
-from rdflib import Graph, Namespace, URIRef
+from rdflib import Namespace, URIRef
 from rapidfuzz import process, fuzz
 
-from agent.constants import DATA_DIR, CACHE_DIR, KG_PATH, LABEL_INDEX_PATH
+from agent.constants import DATA_DIR, CACHE_DIR, KG_PATH, LABEL_INDEX_PATH, MOVIE_INDEX_PATH
+from agent.graph_executor import GraphExecutor
 
 log = logging.getLogger(__name__)
 RDFS = Namespace("http://www.w3.org/2000/01/rdf-schema#")
 
 ENTITY_TOPK = 5
 MIN_FUZZY_SCORE = 80 
+# Graph label lookups (hits and misses) for IRIs not in entity_labels.json
+LABEL_CACHE_SIZE = 100_000
+# Mention -> best (label, iri, score) match; a fuzzy miss scans every label
+MATCH_CACHE_SIZE = 10_000
 
 STOPWORDS = {
     "who", "what", "where", "when", "which", "how", "is", "was", "did", "does",
@@ -27,14 +34,23 @@ STOPWORDS = {
     "look", "give", "find", "looking", "for", "watch", "in", "can", "you"
 }
 
-@dataclass
+# Part of the movie index cache stamp; bump when the scan rules or the
+# pickled layout change so older caches are rebuilt instead of reused.
+MOVIE_INDEX_VERSION = 2
+
+# Quoted titles, e.g. 'Who directed "Fargo"?'
+QUOTED_RE = re.compile(r'["\'‘](.*?)["\'’]')
+QUOTE_OPENERS = ('"', "'", "‘")
+
+
+@dataclass(slots=True)
 class EntityCandidate:
     label: str
     iri: str
     score: float
 
 class EntityLinker:
-    def __init__(self, kg_path: str = None, metadata_dir: Path = None):
+    def __init__(self, kg_path: str = None, metadata_dir: Path = None, graph: GraphExecutor = None):
         self.index_path = LABEL_INDEX_PATH 
         self.label_to_iri: Dict[str, str] = {}
         self.iri_to_label: Dict[str, str] = {}
@@ -44,26 +60,32 @@ class EntityLinker:
         self.kg_path = kg_path if kg_path else KG_PATH
         self.metadata_dir = metadata_dir
         
-        # Keep a reference to the graph for dynamic lookups
-        self.kg = None 
+        # Graph for dynamic lookups; pass the app's GraphExecutor to avoid
+        # holding a second parsed copy of the KG.
+        self.graph = graph
+        self._graph_label = lru_cache(maxsize=LABEL_CACHE_SIZE)(self._graph_label_impl)
+        self._match = lru_cache(maxsize=MATCH_CACHE_SIZE)(self._match_impl)
         
         self._build_index_from_scratch()
 
     def _build_index_from_scratch(self):
-        # 1. Parse Graph
-        self.kg = Graph()
-        fmt = "nt" if str(self.kg_path).endswith(".nt") else "turtle"
-        log.info(f"Parsing KG from {self.kg_path} ({fmt})...")
-        self.kg.parse(self.kg_path, format=fmt)
+        # 1. Parse Graph (only when no shared executor was given)
+        if self.graph is None:
+            log.info(f"Parsing KG from {self.kg_path}...")
+            self.graph = GraphExecutor(self.kg_path)
         
         # 2. Load Pre-computed Labels (Fast)
         loaded_json = False
         if self.metadata_dir:
             labels_path = self.metadata_dir / "entity_labels.json"
-            if labels_path.exists():
-                log.info(f"Loading labels from {labels_path}...")
+            try:
                 with open(labels_path, "r") as f:
-                    self.iri_to_label = json.load(f)
+                    log.info(f"Loading labels from {labels_path}...")
+                    # Interned so the label maps and movie set share one str per IRI
+                    self.iri_to_label = {sys.intern(k): v for k, v in json.load(f).items()}
+            except FileNotFoundError:
+                pass
+            else:
                 for uri, label in self.iri_to_label.items():
                     self.label_to_iri[label] = uri
                     self.lower_label_to_iri[label.lower()] = uri
@@ -84,26 +106,32 @@ class EntityLinker:
         rated_entities = set()
         self.movie_like_entities = set()
         
-        log.info("Scanning graph for movie entities...")
-        for s, p, o in self.kg:
-            s_str = str(s)
-            
+        cached = self._load_movie_index()
+        if cached is not None:
+            self.movie_like_entities, rated_entities = cached
+        else:
+            log.info("Scanning graph for movie entities...")
+            # Bound-predicate patterns hit the store's POS index instead of
+            # walking every triple in the graph.
             # Rating is the strongest signal
-            if p == prop_rating:
-                rated_entities.add(s_str)
-                self.movie_like_entities.add(s_str)
-            
+            rated_entities = {sys.intern(str(s)) for s in self.graph.subjects(prop_rating)}
+            self.movie_like_entities |= rated_entities
+
             # Instance of Film
-            elif p == P_INSTANCE and o == Q_FILM:
-                self.movie_like_entities.add(s_str)
-                
+            for s in self.graph.subjects(P_INSTANCE, Q_FILM):
+                self.movie_like_entities.add(sys.intern(str(s)))
+
             # Other indicators
-            elif p in movie_indicators:
-                self.movie_like_entities.add(s_str)
+            for pred in movie_indicators:
+                for s in self.graph.subjects(pred):
+                    self.movie_like_entities.add(sys.intern(str(s)))
+
+        if cached is None:
+            self._save_movie_index(self.movie_like_entities, rated_entities)
 
         # If JSON missing, build from graph (Fallback)
         if not loaded_json:
-            self._build_maps_from_graph(self.kg, rated_entities)
+            self._build_maps_from_graph(self.graph, rated_entities)
         
         # Ensure Overrides are marked as movies
         overrides = [
@@ -121,47 +149,112 @@ class EntityLinker:
 
         log.info(f"Index built. Movies detected: {len(self.movie_like_entities)}")
 
+    def _kg_stamp(self) -> Optional[str]:
+        try:
+            st = os.stat(self.kg_path)
+        except OSError:
+            return None
+        return f"v{MOVIE_INDEX_VERSION}|{Path(self.kg_path).resolve()}|{st.st_size}|{st.st_mtime_ns}"
+
+    def _load_movie_index(self) -> Optional[Tuple[Set[str], Set[str]]]:
+        """(movie-like, rated) IRIs from MOVIE_INDEX_PATH if it was built from this KG file."""
+        stamp = self._kg_stamp()
+        if stamp is None:
+            return None
+        try:
+            with open(MOVIE_INDEX_PATH, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if not isinstance(data, dict) or data.get("stamp") != stamp:
+            return None
+        log.info(f"Loaded movie index from {MOVIE_INDEX_PATH}")
+        movies = {sys.intern(u) for u in data["movies"]}
+        rated = {sys.intern(u) for u in data["rated"]}
+        return movies, rated
+
+    def _save_movie_index(self, movies: Set[str], rated: Set[str]) -> None:
+        """Persist the scan keyed by the KG's path, size and mtime; best effort."""
+        stamp = self._kg_stamp()
+        if stamp is None:
+            return
+        tmp = f"{MOVIE_INDEX_PATH}.tmp"
+        try:
+            os.makedirs(os.path.dirname(MOVIE_INDEX_PATH) or ".", exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump({"stamp": stamp, "movies": movies, "rated": rated}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            # Atomic swap, so a crash mid-write never leaves a truncated index
+            os.replace(tmp, MOVIE_INDEX_PATH)
+        except OSError as e:
+            log.warning(f"Could not write movie index {MOVIE_INDEX_PATH}: {e}")
+
     def _build_maps_from_graph(self, kg, rated_entities):
-        # ... (Logic same as before, omitted for brevity if not used) ...
-        pass
+        """
+        Fallback when entity_labels.json is missing: fill the label maps with
+        one rdfs:label pattern scan, so later lookups are plain dict hits.
+        First label per IRI wins; on a shared label, rated (movie) IRIs win.
+        """
+        log.info("Building label maps from graph...")
+        for s, o in kg.subject_objects(RDFS.label):
+            uri = sys.intern(str(s))
+            if uri in self.iri_to_label:
+                continue
+            label = str(o)
+            self.iri_to_label[uri] = label
+            if label not in self.label_to_iri or uri in rated_entities:
+                self.label_to_iri[label] = uri
+                self.lower_label_to_iri[label.lower()] = uri
+        log.info(f"Label maps built from graph: {len(self.iri_to_label)} labels")
 
     def is_movie(self, iri: str) -> bool:
         return iri in self.movie_like_entities
 
 # ... (keep existing methods) ...
 
-    def get_label(self, iri: str) -> str:
+    def find_label(self, iri: str) -> Optional[str]:
+        """Real label for an IRI (labels JSON, then graph), or None if it has none."""
         clean = iri.strip("<>")
         
         # 1. Dictionary Lookup
-        if clean in self.iri_to_label: 
-            return self.iri_to_label[clean]
+        lbl = self.iri_to_label.get(clean)
+        if lbl is not None:
+            return lbl
         
-        # 2. Dynamic Graph Lookup
-        if self.kg:
-            q = f"""SELECT ?l WHERE {{ <{clean}> <http://www.w3.org/2000/01/rdf-schema#label> ?l }} LIMIT 1"""
-            try:
-                res = list(self.kg.query(q))
-                if res:
-                    lbl = str(res[0][0])
-                    self.iri_to_label[clean] = lbl
-                    return lbl
-            except: pass
+        # 2. Dynamic Graph Lookup (memoized, so repeated misses stay cheap)
+        return self._graph_label(clean)
+
+    def get_label(self, iri: str) -> str:
+        lbl = self.find_label(iri)
+        if lbl is not None:
+            return lbl
+        clean = iri.strip("<>")
 
         # 3. Fallback: Beautify QID or URI
         # If it's Q12345, return "Unknown Movie (Q12345)" to be honest
+        # (rpartition: last path segment without building a list)
+        tail = clean.rpartition("/")[2]
         if "entity/Q" in clean:
-            qid = clean.split("/")[-1]
-            return f"Unknown Title ({qid})"
+            return f"Unknown Title ({tail})"
             
-        return clean.split("/")[-1]
+        return tail
+
+    def _graph_label_impl(self, clean: str):
+        if self.graph is None:
+            return None
+        try:
+            for lbl in self.graph.objects(URIRef(clean), RDFS.label):
+                return str(lbl)
+        except Exception: pass
+        return None
 
     def link(self, text: str) -> List[Tuple[str, str, int]]:
         candidates = []
-        # Quotes
-        for m in re.findall(r'["\'‘](.*?)["\'’]', text):
-            res = self._match(m)
-            if res: candidates.append(res)
+        # Quotes (skip the regex when no opening quote is present)
+        if any(c in text for c in QUOTE_OPENERS):
+            for m in QUOTED_RE.findall(text):
+                res = self._match(m)
+                if res: candidates.append(res)
         
         if not candidates:
             clean = " ".join([w for w in text.strip("?.!, ").split() if w.lower() not in STOPWORDS])
@@ -170,14 +263,18 @@ class EntityLinker:
             
         return candidates
 
-    def _match(self, text):
+    def _match_impl(self, text):
         if not text: return None
         text_lower = text.lower()
         if text_lower in self.lower_label_to_iri:
             uri = self.lower_label_to_iri[text_lower]
             return (self.iri_to_label[uri], uri, 100)
         
-        best = process.extractOne(text, self.label_to_iri.keys(), scorer=fuzz.WRatio)
-        if best and best[1] >= MIN_FUZZY_SCORE:
+        # With a cutoff, rapidfuzz skips labels that cannot reach it (e.g. by
+        # length) and raises the bar as better matches turn up.
+        best = process.extractOne(
+            text, self.label_to_iri.keys(), scorer=fuzz.WRatio, score_cutoff=MIN_FUZZY_SCORE
+        )
+        if best:
             return (best[0], self.label_to_iri[best[0]], best[1])
         return None
\ No newline at end of file
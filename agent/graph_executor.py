@@ -1,14 +1,212 @@
 import logging
-from rdflib import Graph
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.namespace import RDFS
+from rdflib.plugins.sparql.processor import SPARQLProcessor
+
+try:
+    # Rust-backed store: native N-Triples parser and SPO/POS/OSP indexes.
+    import pyoxigraph as oxi
+except ImportError:
+    oxi = None
+
+# The KG is read-only after loading, so SELECT results can be memoized.
+QUERY_CACHE_SIZE = 256
+# Cap concurrent backend queries from the /ask threadpool at the core count.
+QUERY_CONCURRENCY = os.cpu_count() or 1
 
 class GraphExecutor:
-    def __init__(self, path):
-        self.graph = Graph()
+    def __init__(self, path, store_dir=None):
+        """
+        store_dir: optional directory for an on-disk Oxigraph store. When it
+        already holds this KG file (same path, size and mtime) the store is
+        reopened as-is and parsing is skipped. Only one process can hold the
+        store; others open it read-only, or load into memory if it is stale.
+        """
+        self.graph = None
+        self.store = None
         fmt = "nt" if str(path).endswith(".nt") else "turtle"
         logging.info(f"Loading Graph {path}...")
-        self.graph.parse(path, format=fmt)
+        self._cached_select = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._select)
+        self._slots = threading.BoundedSemaphore(QUERY_CONCURRENCY)
+        if oxi is not None:
+            self.store = _open_oxi_store(path, fmt, store_dir)
+            self._pool = ThreadPoolExecutor(max_workers=QUERY_CONCURRENCY, thread_name_prefix="sparql")
+        else:
+            self.graph = Graph()
+            self.graph.parse(path, format=fmt)
+            # Resolved once; Graph.query would otherwise look these up per call
+            self._sparql = SPARQLProcessor(self.graph)
+            self._init_ns = dict(self.graph.namespaces())
+
+    def __len__(self):
+        return len(self.store) if self.store is not None else len(self.graph)
 
     def execute_query(self, q):
         try:
-            return [row.asdict() for row in self.graph.query(q)]
-        except: return []
\ No newline at end of file
+            # Generated queries carry no comments, so collapsing whitespace
+            # is safe and lets re-indented copies share a cache slot.
+            return list(self._cached_select(" ".join(q.split())))
+        except: return []
+
+    def execute_queries(self, qs):
+        """
+        Run independent queries and return their rows in order. On pyoxigraph
+        (which releases the GIL while evaluating) they run concurrently.
+        """
+        qs = list(qs)
+        if self.store is None or len(qs) < 2:
+            return [self.execute_query(q) for q in qs]
+        return list(self._pool.map(self.execute_query, qs))
+
+    def _select(self, q):
+        with self._slots:
+            if self.store is not None:
+                # pyoxigraph releases the GIL while evaluating
+                res = self.store.query(q)
+                names = [v.value for v in res.variables]
+                return tuple(
+                    {n: _to_rdflib(t) for n, t in zip(names, sol) if t is not None}
+                    for sol in res
+                )
+            res = self.graph.query(q, processor=self._sparql, initNs=self._init_ns)
+            # Row is a tuple in res.vars order; zipping skips asdict()'s per-key lookups
+            names = [str(v) for v in res.vars]
+            return tuple(
+                {n: t for n, t in zip(names, row) if t is not None}
+                for row in res
+            )
+
+    def one_hop(self, uri, pred, direct="forward"):
+        """
+        Rows for a single-pattern one-hop lookup with optional rdfs:label,
+        shaped like the results of
+            SELECT ?o ?oLabel WHERE { <uri> <pred> ?o . OPTIONAL { ?o rdfs:label ?oLabel } }
+        (?s/?sLabel when backward) but answered straight from the store's
+        indexes instead of through the SPARQL engine.
+        """
+        u, p = URIRef(uri), URIRef(pred)
+        if direct == "forward":
+            var, hits = "o", self.objects(u, p)
+        else:
+            var, hits = "s", self.subjects(p, u)
+        rows = []
+        try:
+            for term in hits:
+                labels = [] if isinstance(term, Literal) else list(self.objects(term, RDFS.label))
+                if labels:
+                    rows.extend({var: term, f"{var}Label": lbl} for lbl in labels)
+                else:
+                    rows.append({var: term})
+        except: return []
+        return rows
+
+    def triples(self, pattern):
+        """Yield (s, p, o) rdflib terms matching a triple pattern; None is a wildcard."""
+        if self.store is not None:
+            s, p, o = map(_to_oxi_opt, pattern)
+            for quad in self.store.quads_for_pattern(s, p, o):
+                yield _to_rdflib(quad.subject), _to_rdflib(quad.predicate), _to_rdflib(quad.object)
+        else:
+            yield from self.graph.triples(pattern)
+
+    # Single-position variants of triples(): on Oxigraph only the requested
+    # term is converted to rdflib, not all three per match.
+    def subjects(self, predicate=None, object=None):
+        """Yield subjects of (?s, predicate, object); None is a wildcard."""
+        if self.store is not None:
+            for quad in self.store.quads_for_pattern(None, _to_oxi_opt(predicate), _to_oxi_opt(object)):
+                yield _to_rdflib(quad.subject)
+        else:
+            yield from self.graph.subjects(predicate, object)
+
+    def subject_objects(self, predicate=None):
+        """Yield (subject, object) pairs for predicate; None is a wildcard."""
+        if self.store is not None:
+            for quad in self.store.quads_for_pattern(None, _to_oxi_opt(predicate), None):
+                yield _to_rdflib(quad.subject), _to_rdflib(quad.object)
+        else:
+            yield from self.graph.subject_objects(predicate)
+
+    def objects(self, subject=None, predicate=None):
+        """Yield objects of (subject, predicate, ?o); None is a wildcard."""
+        if self.store is not None:
+            for quad in self.store.quads_for_pattern(_to_oxi_opt(subject), _to_oxi_opt(predicate), None):
+                yield _to_rdflib(quad.object)
+        else:
+            yield from self.graph.objects(subject, predicate)
+
+
+def _open_oxi_store(path, fmt, store_dir):
+    rdf_fmt = oxi.RdfFormat.N_TRIPLES if fmt == "nt" else oxi.RdfFormat.TURTLE
+    if store_dir is None:
+        store = oxi.Store()
+        store.bulk_load(path=str(path), format=rdf_fmt)
+        return store
+
+    st = os.stat(path)
+    stamp = f"{Path(path).resolve()}|{st.st_size}|{st.st_mtime_ns}"
+    marker = Path(f"{store_dir}.source")
+    Path(store_dir).mkdir(parents=True, exist_ok=True)
+    try:
+        store = oxi.Store(str(store_dir))
+    except OSError as e:
+        # RocksDB lets a single process hold the store open for writing;
+        # any other (a second worker, a notebook) reads it if it is current
+        # and otherwise loads the KG into memory.
+        logging.warning(f"Graph store {store_dir} is in use ({e})")
+        if _read_stamp(marker) == stamp:
+            try:
+                logging.info(f"Opening graph store {store_dir} read-only")
+                return oxi.Store.read_only(str(store_dir))
+            except OSError:
+                pass
+        return _open_oxi_store(path, fmt, None)
+    if _read_stamp(marker) == stamp and len(store):
+        logging.info(f"Reusing on-disk graph store {store_dir}")
+        return store
+
+    store.clear()
+    store.bulk_load(path=str(path), format=rdf_fmt)
+    store.flush()
+    # Written last, so an interrupted load is redone on the next start
+    marker.write_text(stamp)
+    return store
+
+
+def _read_stamp(marker):
+    try:
+        return marker.read_text()
+    except FileNotFoundError:
+        return None
+
+
+def _to_rdflib(term):
+    # Callers rely on str()/float() of rdflib terms; keep that contract.
+    if isinstance(term, oxi.NamedNode):
+        return URIRef(term.value)
+    if isinstance(term, oxi.Literal):
+        if term.language:
+            return Literal(term.value, lang=term.language)
+        return Literal(term.value, datatype=URIRef(term.datatype.value))
+    return BNode(term.value)
+
+
+def _to_oxi(term):
+    if isinstance(term, Literal):
+        if term.language:
+            return oxi.Literal(str(term), language=term.language)
+        if term.datatype:
+            return oxi.Literal(str(term), datatype=oxi.NamedNode(str(term.datatype)))
+        return oxi.Literal(str(term))
+    if isinstance(term, BNode):
+        return oxi.BlankNode(str(term))
+    return oxi.NamedNode(str(term))
+
+
+def _to_oxi_opt(term):
+    return None if term is None else _to_oxi(term)
@@ -1,11 +1,12 @@
 import json
 import logging
-import os
 from pathlib import Path
 from typing import Dict, Optional, List
 
 logger = logging.getLogger(__name__)
 
+JPG_EXTENSIONS = frozenset({"jpg", "jpeg"})
+
 class MultimediaIndex:
     """
     Handles looking up images from the images.json file.
@@ -17,25 +18,30 @@ class MultimediaIndex:
         self.imdb_map: Dict[str, str] = {}
         
         # Load IMDb map for bridging
+        # Just open and treat a missing file as "no map": one syscall, no exists() race.
         if metadata_dir:
             imdb_path = metadata_dir / "imdb_map.json"
-            if imdb_path.exists():
-                try:
-                    with open(imdb_path, "r") as f: 
-                        self.imdb_map = json.load(f)
-                except Exception as e:
-                    logger.error(f"Failed to load imdb_map: {e}")
+            try:
+                with open(imdb_path, "r") as f: 
+                    self.imdb_map = json.load(f)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Failed to load imdb_map: {e}")
         
         self._load_index()
 
     def _load_index(self):
-        if not self.images_path.exists():
-            return
-
         try:
             with open(self.images_path, "r", encoding="utf-8") as f: 
                 data = json.load(f)
-            
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error(f"Failed to load images.json: {e}", exc_info=True)
+            return
+
+        try:
             count = 0
             for item in data:
                 img_path = item.get("img")
@@ -44,13 +50,12 @@ class MultimediaIndex:
                 # --- CRITICAL FIX: Only allow JPGs ---
                 # The frontend fails with PNGs even if ID is stripped.
                 # We prioritize JPGs which align with the assignment examples.
-                if not img_path.lower().endswith((".jpg", ".jpeg")):
+                # One rpartition gives both the extension check and the ID.
+                clean_id, dot, ext = img_path.rpartition(".")
+                if not dot or ext.lower() not in JPG_EXTENSIONS:
                     continue
                 # -------------------------------------
                 
-                # Remove extension for ID
-                clean_id, _ = os.path.splitext(img_path)
-                
                 # Map URIs
                 uris = []
                 for key in ["movie", "cast", "id"]:
@@ -61,12 +66,7 @@ class MultimediaIndex:
                         uris.append(val)
                 
                 for uri in uris:
-                    clean_uri = uri.strip("<>")
-                    self.image_map[clean_uri] = clean_id
-                    
-                    if clean_uri.startswith("tt") or clean_uri.startswith("nm"):
-                        self.image_map[clean_uri] = clean_id
-                    
+                    self.image_map[uri.strip("<>")] = clean_id
                     count += 1
             
             logger.info(f"Loaded {count} JPG image mappings.")
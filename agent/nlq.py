@@ -1,8 +1,43 @@
 import logging
-from agent.constants import PREDICATE_MAP
+import re
+from itertools import islice
+from operator import itemgetter
+from rdflib import Literal
+from agent.constants import PREDICATE_MAP, PREDICATE_MAP_SORTED
 
 logger = logging.getLogger(__name__)
 
+MAX_ANSWERS = 10
+
+# Longest phrase wins, ties go to PREDICATE_MAP order, as the old per-call
+# sorted() scan did. The zero-width lookahead finds the longest key starting
+# at every position in one pass, so overlaps are not lost.
+_PREDICATE_KEYS = [k for k, _ in PREDICATE_MAP_SORTED]
+_PREDICATE_RANK = {k: i for i, k in enumerate(_PREDICATE_KEYS)}
+_PREDICATE_RE = re.compile("(?=(" + "|".join(map(re.escape, _PREDICATE_KEYS)) + "))")
+
+
+def _find_predicate(q_lower):
+    hits = {m.group(1) for m in _PREDICATE_RE.finditer(q_lower)}
+    if not hits:
+        return None
+    return PREDICATE_MAP[min(hits, key=_PREDICATE_RANK.__getitem__)]
+
+
+def _dedup_and_join(vals, limit=MAX_ANSWERS):
+    """Join labels in first-seen order, merging case variants (casefold) and keeping the longer spelling."""
+    seen = {}
+    for v in vals:
+        s = str(v).strip()
+        if not s:
+            continue
+        k = s.casefold()
+        cur = seen.get(k)
+        if cur is None or len(s) > len(cur):
+            seen[k] = s  # re-assigning keeps the key's first-seen position
+    return ", ".join(islice(seen.values(), limit))
+
+
 class QAEngine:
     def __init__(self, graph, linker, emb, mm, composer):
         self.graph = graph
@@ -11,41 +46,40 @@ class QAEngine:
         self.mm = mm
         self.composer = composer
 
-    def answer_question(self, query: str) -> str:
+    def answer_question(self, query: str, linked=None) -> str:
+        """linked: link(query) result the caller already has, so it is not redone."""
         q_lower = query.lower()
         
-        target_pred = None
-        for k in sorted(PREDICATE_MAP.keys(), key=len, reverse=True):
-            if k in q_lower:
-                target_pred = PREDICATE_MAP[k]
-                break
+        target_pred = _find_predicate(q_lower)
         
         if not target_pred:
             if "who" in q_lower: target_pred = PREDICATE_MAP["director"]
             elif "when" in q_lower: target_pred = PREDICATE_MAP["publication date"]
             else: return None
 
-        linked = self.linker.link(query)
+        if linked is None:
+            linked = self.linker.link(query)
         if not linked: return "I couldn't identify the subject."
-        linked.sort(key=lambda x: x[2], reverse=True)
-        lbl, uri, _ = linked[0]
+        # Best-scoring link (first one on ties); no sort, and the caller's list is left as-is
+        lbl, uri, _ = max(linked, key=itemgetter(2))
 
-        # 1. Graph Lookup
+        # 1. Graph Lookup (plain index lookups; no SPARQL parse/plan needed)
         for direct in ["forward", "backward"]:
-            q = self.composer.compose_one_hop_qa(uri, target_pred, direct)
-            res = self.graph.execute_query(q)
+            res = self.graph.one_hop(uri, target_pred, direct)
             answers = []
             for r in res:
-                # Try Label from SPARQL
+                # Try Label from the graph
                 ans = str(r.get('oLabel', r.get('sLabel', '')))
-                # If empty, get ID and lookup in Linker dict
+                # If empty: literals (dates, numbers) are the answer as-is;
+                # only IRIs need a lookup in the Linker dict
                 if not ans:
-                    val = str(r.get('o', r.get('s', '')))
-                    if val: ans = self.linker.get_label(val)
+                    val = r.get('o', r.get('s'))
+                    if isinstance(val, Literal): ans = str(val)
+                    elif val is not None: ans = self.linker.get_label(str(val))
                 if ans: answers.append(ans)
             
             if answers:
-                return f"The answer is: {', '.join(list(set(answers))[:10])}"
+                return f"The answer is: {_dedup_and_join(answers)}"
 
         # 2. Embedding Fallback
         preds = self.emb.predict_tail(uri, target_pred, k=1)
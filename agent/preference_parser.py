@@ -1,16 +1,34 @@
 import re
 import logging
+from types import MappingProxyType
 from typing import Dict, Any, List, Tuple
 from agent.entity_linker import EntityLinker
 from agent.relation_mapper import RelationMapper
 from agent.constants import (
-    RECOMMENDATION_KEYWORDS, QA_KEYWORDS, NEGATION_KEYWORDS,
-    PREFERENCE_KEYWORDS, FOLLOW_UP_KEYWORDS, SUPPORTED_LANGUAGES_REGEX
+    QA_KEYWORDS, NEGATION_KEYWORDS, PREFERENCE_KEYWORDS,
+    SUPPORTED_LANGUAGES_REGEX, RECOMMENDATION_RE, FOLLOW_UP_RE
 )
-from agent.session_manager import Session
+from agent.session_manager import SessionState
 
 logger = logging.getLogger(__name__)
 
+# Regex for years (e.g., 1990, 1990s, after 2000)
+YEAR_RE = re.compile(r'(\b(after|before|since|from|in)\s+)?(\d{4})s?\b', re.IGNORECASE)
+
+# Explicit languages (French, Japanese, etc.)
+# We map the name to the Wikidata Q-ID directly here for robustness
+LANG_MAP = MappingProxyType({
+    "french": "http://www.wikidata.org/entity/Q150",
+    "german": "http://www.wikidata.org/entity/Q188",
+    "spanish": "http://www.wikidata.org/entity/Q1321",
+    "english": "http://www.wikidata.org/entity/Q1860",
+    "italian": "http://www.wikidata.org/entity/Q652",
+    "japanese": "http://www.wikidata.org/entity/Q5287",
+    "korean": "http://www.wikidata.org/entity/Q9176",
+    "chinese": "http://www.wikidata.org/entity/Q7850",
+})
+LANG_RE = re.compile("|".join(map(re.escape, LANG_MAP)))
+
 class PreferenceParser:
     """
     Parses natural language queries to detect intent, extract preferences,
@@ -21,32 +39,20 @@ class PreferenceParser:
         self.entity_linker = entity_linker
         self.relation_mapper = relation_mapper
         
-        # Regex for years (e.g., 1990, 1990s, after 2000)
-        self.year_regex = re.compile(r'(\b(after|before|since|from|in)\s+)?(\d{4})s?\b', re.IGNORECASE)
-        
-        # Regex for explicit languages (French, Japanese, etc.)
-        # We map the name to the Wikidata Q-ID directly here for robustness
-        self.lang_map = {
-            "french": "http://www.wikidata.org/entity/Q150",
-            "german": "http://www.wikidata.org/entity/Q188",
-            "spanish": "http://www.wikidata.org/entity/Q1321",
-            "english": "http://www.wikidata.org/entity/Q1860",
-            "italian": "http://www.wikidata.org/entity/Q652",
-            "japanese": "http://www.wikidata.org/entity/Q5287",
-            "korean": "http://www.wikidata.org/entity/Q9176",
-            "chinese": "http://www.wikidata.org/entity/Q7850",
-        }
+        # Shared, read-only tables (built once at import)
+        self.year_regex = YEAR_RE
+        self.lang_map = LANG_MAP
 
         logger.info("PreferenceParser initialized.")
 
-    def parse(self, query: str, session: Session) -> Dict[str, Any]:
+    def parse(self, query: str, session: SessionState) -> Dict[str, Any]:
         logger.debug(f"Parsing query: {query}")
         query_lower = query.lower()
 
         intent = self.detect_intent(query_lower)
         seed_movies = self.extract_seed_movies(query)
         preferences, constraints, negations = self.extract_preferences_and_constraints(query)
-        is_follow_up = any(keyword in query_lower for keyword in FOLLOW_UP_KEYWORDS)
+        is_follow_up = FOLLOW_UP_RE.search(query_lower) is not None
 
         if seed_movies or preferences or constraints or negations:
             intent = 'recommendation'
@@ -61,7 +67,7 @@ class PreferenceParser:
         }
 
     def detect_intent(self, query_lower: str) -> str:
-        if any(keyword in query_lower for keyword in RECOMMENDATION_KEYWORDS):
+        if RECOMMENDATION_RE.search(query_lower):
             return 'recommendation'
         if '?' not in query_lower and len(query_lower.split()) < 10:
              return 'recommendation'
@@ -82,9 +88,11 @@ class PreferenceParser:
         query_lower = query.lower()
         
         # 1. Extract Explicit Languages
+        # One scan for all names; constraints keep LANG_MAP order
+        mentioned = set(LANG_RE.findall(query_lower))
         for lang_name, lang_uri in self.lang_map.items():
             # Check for "in Japanese", "Japanese movie", etc.
-            if lang_name in query_lower:
+            if lang_name in mentioned:
                 logger.info(f"Detected language constraint: {lang_name} -> {lang_uri}")
                 if "language" not in constraints:
                     constraints["language"] = []
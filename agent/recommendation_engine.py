@@ -1,11 +1,34 @@
+import heapq
 import logging
-from typing import Any, Dict, List, Set, Tuple
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from agent.constants import PREFIXES, PREDICATE_MAP  # PREDICATE_MAP 目前暂时未用，但保留以防后续扩展
 
 logger = logging.getLogger(__name__)
 
 
+def _iri_terms(uris: List[str], sep: str = " ") -> str:
+    """
+    <IRI> terms for a SPARQL VALUES block (sep=" ") or IN list (sep=", "),
+    built with a single join instead of one f-string per URI.
+    """
+    if not uris:
+        return ""
+    return "<" + (">" + sep + "<").join(uris) + ">"
+
+
+@dataclass(slots=True)
+class _Candidate:
+    """Per-movie accumulator for the hybrid ranking."""
+    coverage: int = 0
+    ratings: List[float] = field(default_factory=list)
+    label: Optional[str] = None
+    avg_rating: float = 0.0
+    emb_sim: float = 0.0
+
+
+
 class RecommendationEngine:
     """
     Recommendation Engine with a tested hybrid strategy:
@@ -42,6 +65,8 @@ class RecommendationEngine:
     WD_COMPOSER_TAKEMITSU = "wd:Q155467"
     WD_GENRE_BIOGRAPHICAL = "wd:Q645928"
 
+    WD_ENTITY = "http://www.wikidata.org/entity/"
+
     def __init__(self, graph, emb, linker, mm, composer):
         self.graph = graph
         self.emb = emb
@@ -72,10 +97,11 @@ class RecommendationEngine:
         Seeds may be URIs or small dicts with a 'uri' key.
         Return a de-duplicated list of URI strings.
         """
-        uris: List[str] = []
         if not seeds:
-            return uris
+            return []
 
+        # Insertion-ordered dict: O(1) duplicate checks, first-seen order
+        uris: Dict[str, None] = {}
         for s in seeds:
             if not s:
                 continue
@@ -83,10 +109,10 @@ class RecommendationEngine:
                 uri = s["uri"]
             else:
                 uri = s
-            if uri and uri not in uris:
-                uris.append(uri)
+            if uri:
+                uris[uri] = None
 
-        return uris
+        return list(uris)
 
     def _is_movie_safe(self, uri: str) -> bool:
         if not self.linker:
@@ -108,14 +134,17 @@ class RecommendationEngine:
             results: List[Dict[str, Any]] = []
             
             for uri in uris:
-                # 1. Get Label
+                # 1. Get Label (known is None when the KG has no real label;
+                # decided at the source, not by parsing the display string)
                 try:
-                    label = self.linker.get_label(uri) if self.linker else uri
+                    known = self.linker.find_label(uri) if self.linker else uri
+                    label = known if known is not None else self.linker.get_label(uri)
                 except Exception:
                     logger.exception("Failed to get label for %s", uri)
-                    label = uri.split("/")[-1]
+                    known = None
+                    label = uri.rpartition("/")[2]
 
-                if ("Unknown" in label or (label.startswith("Q") and label[1:].isdigit())):
+                if known is None:
                     if len(uris) > len(results) + 1:  
                         continue
                 # --------------------------------
@@ -175,13 +204,12 @@ class RecommendationEngine:
                 if not v:
                     continue
                 s = str(v)
-                if s.startswith("http://www.wikidata.org/entity/"):
+                if s.startswith(self.WD_ENTITY):
                     uri = s
                 elif s.startswith("wd:"):
-                    qid = s.split("wd:", 1)[1]
-                    uri = "http://www.wikidata.org/entity/" + qid
+                    uri = self.WD_ENTITY + s[3:]
                 elif s.startswith("Q"):
-                    uri = "http://www.wikidata.org/entity/" + s
+                    uri = self.WD_ENTITY + s
                 else:
                     # Not a QID/URI – ignore
                     continue
@@ -215,56 +243,89 @@ class RecommendationEngine:
     # Graph query helper (used by hybrid)
     # ------------------------------------------------------------------
 
-    def _run_graph_rec_query(
+    def _compose_graph_rec_query(
         self,
         seed_uri: str,
         constraints: Dict[str, Any] = None,
         k_graph_per_seed: int = None,
-    ) -> List[Dict[str, Any]]:
+    ) -> Optional[str]:
         """
-        Use Composer to build a SPARQL recommendation query for a seed URI
-        and execute it against the Graph executor.
+        Use Composer to build a SPARQL recommendation query for a seed URI.
         """
-        if not self.graph or not self.composer:
-            return []
-
-        # 1) Compose query
+        # LIMIT is emitted by the composer, no text rewrite
+        limit_kw = {} if k_graph_per_seed is None else {"limit": int(k_graph_per_seed)}
         try:
             if constraints:
                 try:
-                    query = self.composer.compose_graph_rec_query(seed_uri, constraints)
+                    return self.composer.compose_graph_rec_query(seed_uri, constraints, **limit_kw)
                 except TypeError:
-                    query = self.composer.compose_graph_rec_query(seed_uri)
-            else:
-                query = self.composer.compose_graph_rec_query(seed_uri)
+                    return self.composer.compose_graph_rec_query(seed_uri, **limit_kw)
+            return self.composer.compose_graph_rec_query(seed_uri, **limit_kw)
         except Exception:
             logger.exception(
                 "Failed to compose graph recommendation query for seed %s",
                 seed_uri,
             )
-            return []
+            return None
+
+    def _execute_queries(self, queries: List[str]) -> List[List[Dict[str, Any]]]:
+        """
+        Execute independent queries, concurrently when the executor supports it.
+        """
+        try:
+            if hasattr(self.graph, "execute_queries"):
+                return [rows or [] for rows in self.graph.execute_queries(queries)]
+        except Exception:
+            logger.exception("Concurrent graph queries failed; running sequentially")
 
-        # 2) Optionally adjust LIMIT
-        if k_graph_per_seed is not None:
+        results = []
+        for query in queries:
             try:
-                import re
-                query = re.sub(r"LIMIT\s+\d+", f"LIMIT {int(k_graph_per_seed)}", query)
+                results.append(self.graph.execute_query(query) or [])
             except Exception:
-                query = f"{query}\nLIMIT {int(k_graph_per_seed)}"
+                logger.exception("Graph query failed")
+                results.append([])
+        return results
 
-        # 3) Execute query
-        try:
-            rows = self.graph.execute_query(query)
-        except Exception:
-            logger.exception("Graph query failed for seed %s", seed_uri)
-            return []
+    def _run_graph_rec_queries(
+        self,
+        seed_uris: List[str],
+        constraints: Dict[str, Any] = None,
+        k_graph_per_seed: int = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Build the per-seed recommendation queries and execute them together;
+        returns one row list per seed, in seed order.
+        """
+        if not self.graph or not self.composer:
+            return [[] for _ in seed_uris]
 
-        return rows or []
+        queries = [
+            self._compose_graph_rec_query(seed_uri, constraints, k_graph_per_seed)
+            for seed_uri in seed_uris
+        ]
+        rows_iter = iter(self._execute_queries([q for q in queries if q]))
+        return [next(rows_iter) if q else [] for q in queries]
 
     # ------------------------------------------------------------------
     # Hybrid graph + embedding (movie seeds)
     # ------------------------------------------------------------------
 
+    def _nearest_neighbors_batch(
+        self, seed_uris: List[str], k: int
+    ) -> Optional[Dict[str, List[Tuple[str, float]]]]:
+        """
+        One batched index search for all seeds, or None if the executor
+        cannot batch (callers then fall back to per-seed lookups).
+        """
+        if not hasattr(self.emb, "get_nearest_neighbors_batch"):
+            return None
+        try:
+            return self.emb.get_nearest_neighbors_batch(seed_uris, k=k)
+        except Exception:
+            logger.exception("Batched nearest-neighbors lookup failed")
+            return None
+
     def _compute_embedding_similarities(
         self,
         seed_uris: List[str],
@@ -280,15 +341,19 @@ class RecommendationEngine:
             return sims
 
         seed_neighbor_maps: Dict[str, Dict[str, float]] = {}
+        batch = self._nearest_neighbors_batch(seed_uris, k_per_seed)
 
         for seed in seed_uris:
-            try:
-                neighbors = self.emb.get_nearest_neighbors(seed, k=k_per_seed) or []
-            except Exception:
-                logger.exception(
-                    "Embedding nearest-neighbors lookup failed for seed %s", seed
-                )
-                neighbors = []
+            if batch is not None:
+                neighbors = batch.get(seed, [])
+            else:
+                try:
+                    neighbors = self.emb.get_nearest_neighbors(seed, k=k_per_seed) or []
+                except Exception:
+                    logger.exception(
+                        "Embedding nearest-neighbors lookup failed for seed %s", seed
+                    )
+                    neighbors = []
 
             local_map: Dict[str, float] = {}
             for uri, sim in neighbors:
@@ -301,15 +366,22 @@ class RecommendationEngine:
 
             seed_neighbor_maps[seed] = local_map
 
-        for cand in candidate_uris:
-            per_seed_sims = []
-            for _, nbrs in seed_neighbor_maps.items():
-                if cand in nbrs:
-                    per_seed_sims.append(nbrs[cand])
-            if per_seed_sims:
-                sims[cand] = float(sum(per_seed_sims) / len(per_seed_sims))
-            else:
-                sims[cand] = 0.0
+        # Tally [sum, count] per candidate in one pass over the neighbour
+        # lists, instead of probing every seed map for every candidate.
+        totals: Dict[str, List[float]] = {}
+        for nbrs in seed_neighbor_maps.values():
+            for uri, sim in nbrs.items():
+                if uri not in sims:
+                    continue
+                t = totals.get(uri)
+                if t is None:
+                    totals[uri] = [sim, 1]
+                else:
+                    t[0] += sim
+                    t[1] += 1
+
+        for uri, (total, n) in totals.items():
+            sims[uri] = float(total / n)
 
         return sims
 
@@ -327,13 +399,15 @@ class RecommendationEngine:
         if not self.graph or not self.composer:
             return []
 
-        candidates: Dict[str, Dict[str, Any]] = {}
+        candidates: Dict[str, _Candidate] = {}
         neighbor_sets: List[Set[str]] = []
+        seed_set = set(seed_uris)
 
-        for seed_uri in seed_uris:
-            rows = self._run_graph_rec_query(
-                seed_uri, constraints=constraints, k_graph_per_seed=k_graph_per_seed
-            )
+        # Seed queries are independent; issue them together
+        per_seed_rows = self._run_graph_rec_queries(
+            seed_uris, constraints=constraints, k_graph_per_seed=k_graph_per_seed
+        )
+        for seed_uri, rows in zip(seed_uris, per_seed_rows):
             local_neighbors: Set[str] = set()
 
             for row in rows:
@@ -345,7 +419,7 @@ class RecommendationEngine:
 
                 if not movie_uri:
                     continue
-                if movie_uri in seed_uris:
+                if movie_uri in seed_set:
                     continue
                 # Check linker to ensure it is a movie
                 if self.linker and not self.linker.is_movie(movie_uri):
@@ -353,17 +427,10 @@ class RecommendationEngine:
 
                 local_neighbors.add(movie_uri)
 
-                info = candidates.setdefault(
-                    movie_uri,
-                    {
-                        "coverage": 0,
-                        "ratings": [],
-                        "label": None,
-                        "avg_rating": 0.0,
-                        "emb_sim": 0.0,
-                    },
-                )
-                info["coverage"] += 1
+                info = candidates.get(movie_uri)
+                if info is None:
+                    info = candidates[movie_uri] = _Candidate()
+                info.coverage += 1
 
                 rating_val = None
                 if "rating" in row and row["rating"] is not None:
@@ -372,7 +439,7 @@ class RecommendationEngine:
                     except Exception:
                         rating_val = None
                 if rating_val is not None:
-                    info["ratings"].append(rating_val)
+                    info.ratings.append(rating_val)
 
             local_neighbors.difference_update(seed_uris)
             neighbor_sets.append(local_neighbors)
@@ -403,48 +470,52 @@ class RecommendationEngine:
             logger.debug("Hybrid rec: active candidate set empty.")
             return []
 
-        # Fill avg_rating and labels
+        # Fill avg_rating
         for uri in active_uris:
             info = candidates[uri]
-            if info["ratings"]:
-                info["avg_rating"] = float(
-                    sum(info["ratings"]) / len(info["ratings"])
+            if info.ratings:
+                info.avg_rating = float(
+                    sum(info.ratings) / len(info.ratings)
                 )
             else:
-                info["avg_rating"] = 0.0
-
-            if info["label"] is None:
-                try:
-                    info["label"] = (
-                        self.linker.get_label(uri) if self.linker else uri
-                    )
-                except Exception:
-                    logger.exception("Failed to get label for %s", uri)
-                    info["label"] = uri.rsplit("/", 1)[-1]
+                info.avg_rating = 0.0
 
         # Embedding similarities (secondary signal)
         emb_sims = self._compute_embedding_similarities(
             seed_uris, active_uris, k_per_seed=200
         )
         for uri in active_uris:
-            candidates[uri]["emb_sim"] = emb_sims.get(uri, 0.0)
+            candidates[uri].emb_sim = emb_sims.get(uri, 0.0)
 
         # Multiplicative Ranking Score: (Coverage + Sim) * (1 + Rating)
         def sort_key(u: str):
             info = candidates[u]
             # Basic score components
-            score_base = (info["coverage"] * 1.0) + (info["emb_sim"] * self.embed_weight)
+            score_base = (info.coverage * 1.0) + (info.emb_sim * self.embed_weight)
             # Rating boost
-            score_final = score_base * (1 + (info["avg_rating"] / 10.0) * self.rating_boost)
+            score_final = score_base * (1 + (info.avg_rating / 10.0) * self.rating_boost)
             return score_final
 
-        ranked_uris = sorted(active_uris, key=sort_key, reverse=True)[:top_k]
+        ranked_uris = heapq.nlargest(top_k, active_uris, key=sort_key)
 
-        logger.debug(
-            "Hybrid rec: seeds=%s, top candidates=%s",
-            seed_uris,
-            [candidates[u]["label"] for u in ranked_uris],
-        )
+        # Labels only feed this log line (results are labelled later by
+        # _materialize_results), so resolve them for the top-k, on demand.
+        if logger.isEnabledFor(logging.DEBUG):
+            for uri in ranked_uris:
+                info = candidates[uri]
+                if info.label is None:
+                    try:
+                        info.label = (
+                            self.linker.get_label(uri) if self.linker else uri
+                        )
+                    except Exception:
+                        logger.exception("Failed to get label for %s", uri)
+                        info.label = uri.rpartition("/")[2]
+            logger.debug(
+                "Hybrid rec: seeds=%s, top candidates=%s",
+                seed_uris,
+                [candidates[u].label for u in ranked_uris],
+            )
         return ranked_uris
 
     # ------------------------------------------------------------------
@@ -462,7 +533,8 @@ class RecommendationEngine:
         if not self.graph:
             return []
 
-        seed_vals = " ".join(f"<{u}>" for u in seed_movie_uris)
+        # IN lists are comma-separated (a space-separated list is a parse error)
+        seed_vals = _iri_terms(seed_movie_uris, ", ")
 
         # Language-based (Japanese)
         q_lang = f"""{PREFIXES}
@@ -483,11 +555,12 @@ class RecommendationEngine:
         }}"""
 
         candidates: Dict[str, Dict[str, Any]] = {}
+        seed_set = set(seed_movie_uris)
 
         def add_rows(rows, source_key: str):
             for r in rows or []:
                 uri = str(r["movie"])
-                if uri in seed_movie_uris:
+                if uri in seed_set:
                     continue
                 info = candidates.setdefault(
                     uri,
@@ -502,17 +575,8 @@ class RecommendationEngine:
                         rating = 0.0
                 info["rating"] = max(info["rating"], rating)
 
-        try:
-            rows_lang = self.graph.execute_query(q_lang)
-        except Exception:
-            logger.exception("Japanese attribute rec: language query failed")
-            rows_lang = []
-
-        try:
-            rows_comp = self.graph.execute_query(q_comp)
-        except Exception:
-            logger.exception("Japanese attribute rec: composer query failed")
-            rows_comp = []
+        # Independent queries; run them together
+        rows_lang, rows_comp = self._execute_queries([q_lang, q_comp])
 
         add_rows(rows_lang, "lang")
         add_rows(rows_comp, "composer")
@@ -524,7 +588,7 @@ class RecommendationEngine:
             uri, info = item
             return (-len(info["sources"]), -info["rating"], uri)
 
-        ranked = sorted(candidates.items(), key=sort_key)[:top_k]
+        ranked = heapq.nsmallest(top_k, candidates.items(), key=sort_key)
         return [uri for uri, _ in ranked]
 
     def _biographical_movies_for_people(
@@ -538,7 +602,7 @@ class RecommendationEngine:
         if not self.graph:
             return []
 
-        p_vals = " ".join(f"<{p}>" for p in person_uris)
+        p_vals = _iri_terms(person_uris)
         q = f"""{PREFIXES}
         SELECT DISTINCT ?m ?r WHERE {{
           VALUES ?p {{ {p_vals} }}
@@ -568,7 +632,7 @@ class RecommendationEngine:
                     rating = 0.0
             movies[uri] = max(movies.get(uri, 0.0), rating)
 
-        ranked = sorted(movies.items(), key=lambda x: (-x[1], x[0]))[:top_k]
+        ranked = heapq.nsmallest(top_k, movies.items(), key=lambda x: (-x[1], x[0]))
         return [uri for uri, _ in ranked]
 
     def _movies_from_people(
@@ -582,7 +646,7 @@ class RecommendationEngine:
         if not self.graph:
             return []
 
-        p_vals = " ".join(f"<{p}>" for p in person_uris)
+        p_vals = _iri_terms(person_uris)
         q = f"""{PREFIXES}
         SELECT DISTINCT ?m WHERE {{
           VALUES ?p {{ {p_vals} }}
@@ -605,7 +669,7 @@ class RecommendationEngine:
         if not self.graph or not movie_seeds:
             return False
 
-        s_vals = " ".join(f"<{u}>" for u in movie_seeds)
+        s_vals = _iri_terms(movie_seeds)
         q = f"""{PREFIXES}
         SELECT DISTINCT ?l WHERE {{
           VALUES ?s {{ {s_vals} }}
@@ -642,15 +706,21 @@ class RecommendationEngine:
             return []
 
         scores: Dict[str, float] = {}
+        # Set probe per neighbour instead of a scan of the seed list
+        exclude = set(seeds)
+        batch = self._nearest_neighbors_batch(seeds, 80)
         for seed in seeds:
-            try:
-                neighbors = self.emb.get_nearest_neighbors(seed, k=80) or []
-            except Exception:
-                logger.exception("Embedding-only lookup failed for seed %s", seed)
-                continue
+            if batch is not None:
+                neighbors = batch.get(seed, [])
+            else:
+                try:
+                    neighbors = self.emb.get_nearest_neighbors(seed, k=80) or []
+                except Exception:
+                    logger.exception("Embedding-only lookup failed for seed %s", seed)
+                    continue
 
             for uri, sim in neighbors:
-                if not uri or uri in seeds:
+                if not uri or uri in exclude:
                     continue
                 if self.linker and not self.linker.is_movie(uri):
                     continue
@@ -663,7 +733,7 @@ class RecommendationEngine:
         if not scores:
             return []
 
-        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+        ranked = heapq.nlargest(top_k, scores.items(), key=lambda x: x[1])
         return [uri for uri, _ in ranked]
 
     # ------------------------------------------------------------------
@@ -692,7 +762,8 @@ class RecommendationEngine:
 
         # Partition seeds into movies and non-movies
         movie_seeds = [u for u in seed_uris if self._is_movie_safe(u)]
-        non_movie_seeds = [u for u in seed_uris if u not in movie_seeds]
+        movie_seed_set = set(movie_seeds)
+        non_movie_seeds = [u for u in seed_uris if u not in movie_seed_set]
 
         final_uris: List[str] = []
 
@@ -20,7 +20,7 @@ from typing import Optional
 from . import constants as C
 
 
-@dataclass
+@dataclass(slots=True)
 class RelationMatch:
     """
     Result of relation mapping.
@@ -13,6 +13,10 @@ from typing import Iterable, List, TypeVar
 
 T = TypeVar("T")
 
+# Compiled once at import; normalize_title runs for every index entry and lookup.
+_QUOTE_TABLE = str.maketrans({"’": "'", "‘": "'", "“": '"', "”": '"'})
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
 
 def normalize_title(title: str) -> str:
     """
@@ -41,12 +45,7 @@ def normalize_title(title: str) -> str:
     s = unicodedata.normalize("NFKC", s)
 
     # unify quotes
-    s = (
-        s.replace("’", "'")
-        .replace("‘", "'")
-        .replace("“", '"')
-        .replace("”", '"')
-    )
+    s = s.translate(_QUOTE_TABLE)
 
     # strip outer quotes
     if (s.startswith("'") and s.endswith("'")) or (s.startswith('"') and s.endswith('"')):
@@ -60,10 +59,10 @@ def normalize_title(title: str) -> str:
             s = s[len(pref) :]
 
     # replace punctuation with spaces
-    s = re.sub(r"[^\w\s]", " ", s)
+    s = _PUNCT_RE.sub(" ", s)
 
-    # collapse whitespace
-    s = re.sub(r"\s+", " ", s).strip()
+    # collapse whitespace (split() with no args also trims both ends)
+    s = " ".join(s.split())
 
     return s
 
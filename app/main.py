@@ -1,7 +1,11 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 from typing import Optional
+from functools import lru_cache
+import gc
 import logging
+import os
 
 from agent.config import Config
 from agent.graph_executor import GraphExecutor
@@ -11,51 +15,116 @@ from agent.multimedia_index import MultimediaIndex
 from agent.composer import Composer
 from agent.recommendation_engine import RecommendationEngine
 from agent.nlq import QAEngine
-from agent.constants import RECOMMENDATION_KEYWORDS, MULTIMEDIA_KEYWORDS
+from agent.constants import RECOMMENDATION_RE, MULTIMEDIA_RE
+
+try:
+    # C JSON encoder for /ask responses; stdlib json is used without it
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    def json_response(payload) -> Response:
+        return Response(orjson.dumps(payload), media_type="application/json")
+else:
+    json_response = JSONResponse
+
+ANSWER_CACHE_SIZE = 2048
 
 logging.basicConfig(level=logging.INFO)
 app = FastAPI()
-comps = {}
+
+class _Components:
+    """Pipeline objects built at startup; slotted so /ask reads are plain attribute loads."""
+    __slots__ = ("qa", "rec", "linker", "mm")
+
+comps = _Components()
 
 class QueryRequest(BaseModel):
     query: str
     user_id: Optional[str] = "guest"
 
-@app.on_event("startup")
-async def startup():
+def build_components(shared: bool = False):
+    """
+    Load the KG, embeddings and indexes into `comps`; a no-op once loaded.
+    shared: True when building before a pre-forking server forks. The KG
+    then goes into an in-memory store, since an on-disk store's handle must
+    not be used from several processes. faiss's OpenMP pool does not survive
+    the fork either, so forked workers search single-threaded (see
+    agent.embedding_executor).
+
+    Without preload each worker builds its own components. The on-disk
+    store is used only when GRAPH_STORE_DIR is set, and only one process
+    can hold it: with `--workers N` the first worker to start owns it and
+    the others open it read-only (or load into memory while it is being
+    rebuilt), so no worker fails on the store's lock.
+    """
+    if hasattr(comps, "qa"):
+        return
     cfg = Config()
-    graph = GraphExecutor(cfg.graph_path)
+    graph = GraphExecutor(cfg.graph_path, store_dir=None if shared else cfg.graph_store_dir)
     emb = EmbeddingExecutor(cfg.entity_embeds_path, cfg.entity_index_path, 
-                            cfg.relation_embeds_path, cfg.relation_index_path)
-    linker = EntityLinker(cfg.graph_path, cfg.metadata_dir)
+                            cfg.relation_embeds_path, cfg.relation_index_path,
+                            quantizer=cfg.embed_quantizer)
+    linker = EntityLinker(cfg.graph_path, cfg.metadata_dir, graph=graph)
     mm = MultimediaIndex(cfg.images_json_path, cfg.metadata_dir)
     composer = Composer()
     
-    comps['qa'] = QAEngine(graph, linker, emb, mm, composer)
-    comps['rec'] = RecommendationEngine(graph, emb, linker, mm, composer)
-    comps['linker'] = linker
-    comps['mm'] = mm
+    comps.qa = QAEngine(graph, linker, emb, mm, composer)
+    comps.rec = RecommendationEngine(graph, emb, linker, mm, composer)
+    comps.linker = linker
+    comps.mm = mm
+
+# PRELOAD_COMPONENTS=1 builds everything at import, so a pre-forking server
+# (gunicorn --preload -k uvicorn.workers.UvicornWorker app.main:app) loads the
+# data once and its workers share those pages copy-on-write.
+# GRAPH_STORE_DIR is ignored on this path, and each worker's faiss searches
+# run on one thread (see build_components).
+if os.getenv("PRELOAD_COMPONENTS") == "1":
+    build_components(shared=True)
+    # Keep the cyclic GC from touching (and so un-sharing) the loaded objects
+    gc.freeze()
+
+@app.on_event("startup")
+async def startup():
+    build_components()
 
+# Plain def: FastAPI runs it in its threadpool, so one slow query does not
+# block other rooms on the event loop.
 @app.post("/ask")
-async def ask(req: QueryRequest):
-    q = req.query.lower()
+def ask(req: QueryRequest):
+    # Payloads are plain str/list/dict/None, so hand them straight to the
+    # response and skip FastAPI's recursive jsonable_encoder pass.
+    return json_response(_answer(req.query.strip()))
+
+# The pipeline is deterministic per query text and the KG is read-only, so
+# repeated questions are answered from here. Outer whitespace is the only
+# normalization: linking and fuzzy scoring are case-sensitive. In-process
+# code that rebuilds components can drop stale answers with _answer.cache_clear().
+@lru_cache(maxsize=ANSWER_CACHE_SIZE)
+def _answer(query: str) -> dict:
+    c = comps  # one global lookup per request
+    q = query.lower()
+    # link() is a fuzzy scan over every label; run it at most once per request
+    linked = None
     
     # Multimedia
-    if any(k in q for k in MULTIMEDIA_KEYWORDS):
-        linked = comps['linker'].link(req.query)
+    if MULTIMEDIA_RE.search(q):
+        linked = c.linker.link(query)
         if linked:
-            img = comps['mm'].get_image(linked[0][1])
+            img = c.mm.get_image(linked[0][1])
             if img: return {"answer": f"Image for {linked[0][0]}", "image": img}
             return {"answer": f"No image found for {linked[0][0]}."}
 
     # Recs
-    if any(k in q for k in RECOMMENDATION_KEYWORDS):
-        linked = comps['linker'].link(req.query)
+    if RECOMMENDATION_RE.search(q):
+        if linked is None:
+            linked = c.linker.link(query)
         if linked:
             seeds = [x[1] for x in linked]
-            recs = comps['rec'].get_recommendations(seeds, {})
+            recs = c.rec.get_recommendations(seeds, {})
             lines = ["Recommendations:"] + [f"- {r['label']}" for r in recs]
             return {"answer": "\n".join(lines), "recommendations": recs}
     
     # QA
-    return {"answer": comps['qa'].answer_question(req.query)}
\ No newline at end of file
+    return {"answer": c.qa.answer_question(query, linked)}
\ No newline at end of file
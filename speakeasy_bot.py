@@ -1,6 +1,7 @@
 import os
 import json
 import logging
+import threading
 import requests
 from speakeasypy import Speakeasy, EventType
 
@@ -13,6 +14,17 @@ SPEAKEASY_PASS = os.getenv("SPEAKEASY_PASS", "Sv9Kx0sH")
 BACKEND_ASK_URL = os.getenv("BACKEND_ASK_URL", "http://localhost:8000/ask")
 BACKEND_HEALTH_URL = os.getenv("BACKEND_HEALTH_URL", "http://localhost:8000/health")
 
+# Keep-alive connections to the backend, reused across messages and rooms.
+# requests.Session is not documented as thread-safe and room callbacks may
+# run concurrently, so each thread gets its own.
+_local = threading.local()
+
+def backend() -> requests.Session:
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
 def render_answer(payload: dict) -> str:
     """Renders the JSON response from /ask into plain text for Speakeasy."""
     
@@ -29,25 +41,26 @@ def render_answer(payload: dict) -> str:
         else:
             return "I couldn't find any answers or recommendations."
 
-    # 2. Append Single Image (Multimedia)
-    # main.py returns {"answer": "...", "image": "image:..."}
-    if "image" in payload and payload["image"]:
-        # Avoid duplicating if it's already in the text
-        if payload["image"] not in reply:
-            reply += f"\n\n{payload['image']}"
+    # 2./3. Collect images not already present in the text, then join once.
+    # main.py returns {"answer": "...", "image": "image:..."} for multimedia and
+    # {"answer": "list of movies...", "recommendations": [{...}, {...}]} for recs.
+    parts = [reply]
+    seen = set()
+
+    image = payload.get("image")
+    if image and image not in reply:
+        parts.append("\n\n" + image)
+        seen.add(image)
 
-    # 3. Append Recommendation Images
-    # main.py returns {"answer": "list of movies...", "recommendations": [{...}, {...}]}
     recs = payload.get("recommendations")
     if recs and isinstance(recs, list):
-        # The text list is usually already in 'reply', so we just check for images to append
         for rec in recs:
-            if rec.get("image"):
-                # Check if this specific image string is already in the text to avoid duplicates
-                if rec["image"] not in reply:
-                    reply += f"\n{rec['image']}"
+            img = rec.get("image")
+            if img and img not in seen and img not in reply:
+                parts.append("\n" + img)
+                seen.add(img)
 
-    return reply
+    return "".join(parts)
 
 def on_new_message(message: str, room):
     text = (message or "").strip()
@@ -55,7 +68,7 @@ def on_new_message(message: str, room):
     print(f"\n[recv][room={room_id}]\n{text}\n")
 
     try:
-        resp = requests.post(BACKEND_ASK_URL, json={"query": text, "user_id": str(room_id)}, timeout=30)
+        resp = backend().post(BACKEND_ASK_URL, json={"query": text, "user_id": str(room_id)}, timeout=30)
         
         if resp.status_code != 200:
             error_msg = f"Backend error: HTTP {resp.status_code}"
@@ -64,17 +77,19 @@ def on_new_message(message: str, room):
             return
 
         data = resp.json()
+        out = render_answer(data)
         
+        # Reply first; the user should not wait on our debug output.
+        room.post_messages(out)
+        print("[sent] response posted.")
+
         # Debug Log
         print("-" * 40)
         print("DEBUG: Raw JSON from Backend:")
-        print(json.dumps(data, indent=2))
+        # Compact, single-line dump: indent=2 re-walks and pads every
+        # recommendation dict and bloats the log.
+        print(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
         print("-" * 40)
-
-        out = render_answer(data)
-        
-        room.post_messages(out)
-        print("[sent] response posted.")
         
     except Exception as e:
         logging.exception("Error handling message")
@@ -82,7 +97,7 @@ def on_new_message(message: str, room):
 
 def main():
     try:
-        h = requests.get(BACKEND_HEALTH_URL, timeout=5)
+        h = backend().get(BACKEND_HEALTH_URL, timeout=5)
         logging.info("Backend health: %s", h.text)
     except Exception as e:
         # Non-critical warning if health check fails
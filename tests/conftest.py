@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from agent import entity_linker, graph_executor
+
+WD = "http://www.wikidata.org/entity/"
+WDT = "http://www.wikidata.org/prop/direct/"
+RDFS_LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+
+
+@pytest.fixture(autouse=True)
+def movie_index_path(tmp_path, monkeypatch):
+    # Keep EntityLinker's movie index cache out of the working tree
+    path = tmp_path / "movie_index.pkl"
+    monkeypatch.setattr(entity_linker, "MOVIE_INDEX_PATH", str(path))
+    return path
+
+
+@pytest.fixture(params=["oxigraph", "rdflib"])
+def backend(request, monkeypatch):
+    """Run a test on each GraphExecutor backend; rdflib stands in when pyoxigraph is missing."""
+    if request.param == "oxigraph" and graph_executor.oxi is None:
+        pytest.skip("pyoxigraph is not installed")
+    if request.param == "rdflib":
+        monkeypatch.setattr(graph_executor, "oxi", None)
+    return request.param
+
+
+def write_embeddings(root, n_entities, dim=8, seed=0):
+    """Random entity/relation embeddings and their id maps (entities are wd:Q0..), laid out like the dataset."""
+    rng = np.random.default_rng(seed)
+    emb_dir = root / "embeddings"
+    emb_dir.mkdir(parents=True, exist_ok=True)
+    paths = {
+        "entity_embeds_path": emb_dir / "entity_embeds.npy",
+        "entity_index_path": emb_dir / "entity_ids.del",
+        "relation_embeds_path": emb_dir / "relation_embeds.npy",
+        "relation_index_path": emb_dir / "relation_ids.del",
+    }
+    np.save(paths["entity_embeds_path"], rng.standard_normal((n_entities, dim), dtype=np.float32))
+    np.save(paths["relation_embeds_path"], rng.standard_normal((1, dim), dtype=np.float32))
+    paths["entity_index_path"].write_text("".join(f"{i}\t{WD}Q{i}\n" for i in range(n_entities)))
+    paths["relation_index_path"].write_text(f"0\t{WDT}P57\n")
+    return paths
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from agent.embedding_executor import EmbeddingExecutor
+
+from conftest import WD, WDT, write_embeddings
+
+N_ENTITIES = 300
+# Largest cosine error each encoding may add (see EmbeddingExecutor)
+SCORE_TOL = {None: 1e-5, "fp16": 1e-3, "int8": 5e-2}
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return write_embeddings(tmp_path, N_ENTITIES, dim=16)
+
+
+def _executor(paths, quantizer):
+    return EmbeddingExecutor(
+        paths["entity_embeds_path"], paths["entity_index_path"],
+        paths["relation_embeds_path"], paths["relation_index_path"],
+        quantizer=quantizer,
+    )
+
+
+def _unit(v):
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+@pytest.mark.parametrize("quantizer", [None, "fp16", "int8"])
+def test_nearest_neighbors_scores_are_cosines(paths, quantizer):
+    emb = _executor(paths, quantizer)
+    vecs = _unit(np.load(paths["entity_embeds_path"]))
+    hits = emb.get_nearest_neighbors(f"{WD}Q7", k=5)
+    assert len(hits) == 5
+    assert f"{WD}Q7" not in [uri for uri, _ in hits]
+    for uri, score in hits:
+        row = int(uri.rpartition("Q")[2])
+        assert score == pytest.approx(float(vecs[7] @ vecs[row]), abs=SCORE_TOL[quantizer])
+    # Batched and cached lookups agree with the single one
+    assert emb.get_nearest_neighbors_batch([f"{WD}Q7", f"{WD}Q8"], k=5)[f"{WD}Q7"] == hits
+
+
+@pytest.mark.parametrize("quantizer", [None, "fp16", "int8"])
+def test_entity_vectors_and_predict_tail(paths, quantizer):
+    emb = _executor(paths, quantizer)
+    vecs = _unit(np.load(paths["entity_embeds_path"]))
+    got = emb._entity_vectors([3, 11])
+    assert got.dtype == np.float32
+    np.testing.assert_allclose(got, vecs[[3, 11]], atol=SCORE_TOL[quantizer])
+
+    tails = emb.predict_tail(f"{WD}Q3", f"{WDT}P57", k=3)
+    assert len(tails) == 3
+    assert emb.predict_tail(f"{WD}Q3", f"{WDT}P161", k=3) == []
+
+
+def test_unknown_quantizer_is_rejected(paths):
+    with pytest.raises(ValueError):
+        _executor(paths, "pq")
@@ -0,0 +1,73 @@
+import pytest
+from rdflib import URIRef
+
+from agent import graph_executor
+from agent.constants import PREFIXES
+from agent.graph_executor import GraphExecutor
+
+from conftest import RDFS_LABEL, WD, WDT
+
+NT = f"""<{WD}Q1> <{WDT}P57> <{WD}Q2> .
+<{WD}Q2> <{RDFS_LABEL}> "Ethan Coen"@en .
+"""
+
+requires_oxigraph = pytest.mark.skipif(graph_executor.oxi is None, reason="pyoxigraph is not installed")
+
+
+@pytest.fixture
+def kg(tmp_path):
+    path = tmp_path / "graph.nt"
+    path.write_text(NT)
+    return path
+
+
+@requires_oxigraph
+def test_two_executors_share_store_dir(kg, tmp_path):
+    store_dir = tmp_path / "oxigraph"
+    first = GraphExecutor(kg, store_dir=store_dir)
+    # The first executor holds the store's lock; the second must still load
+    second = GraphExecutor(kg, store_dir=store_dir)
+    assert len(first) == len(second) == 2
+    for g in (first, second):
+        assert list(g.objects(URIRef(f"{WD}Q1"))) == [URIRef(f"{WD}Q2")]
+
+
+@requires_oxigraph
+def test_locked_stale_store_loads_in_memory(kg, tmp_path):
+    store_dir = tmp_path / "oxigraph"
+    first = GraphExecutor(kg, store_dir=store_dir)
+    kg.write_text(NT + f'<{WD}Q1> <{RDFS_LABEL}> "Fargo"@en .\n')
+    second = GraphExecutor(kg, store_dir=store_dir)
+    assert len(first) == 2
+    assert len(second) == 3
+
+
+ONE_HOP_NT = NT + f"""<{WD}Q1> <{WDT}P57> <{WD}Q3> .
+<{WD}Q3> <{RDFS_LABEL}> "Joel Coen"@en .
+<{WD}Q3> <{RDFS_LABEL}> "Joel David Coen"@en .
+<{WD}Q1> <{WDT}P57> <{WD}Q4> .
+<{WD}Q1> <{WDT}P577> "1996-03-08"^^<http://www.w3.org/2001/XMLSchema#date> .
+<{WD}Q5> <{WDT}P57> <{WD}Q2> .
+"""
+
+
+def _rows(rows):
+    return sorted(sorted(r.items()) for r in rows)
+
+
+@pytest.mark.parametrize("pred, direct, uri", [
+    ("P57", "forward", "Q1"),   # labelled, multi-labelled and unlabelled objects
+    ("P577", "forward", "Q1"),  # literal object
+    ("P57", "backward", "Q2"),
+    ("P161", "forward", "Q1"),  # no match
+])
+def test_one_hop_matches_sparql(tmp_path, backend, pred, direct, uri):
+    path = tmp_path / "graph.nt"
+    path.write_text(ONE_HOP_NT)
+    g = GraphExecutor(path)
+    u, p = f"{WD}{uri}", f"{WDT}{pred}"
+    if direct == "forward":
+        q = f"{PREFIXES} SELECT ?o ?oLabel WHERE {{ <{u}> <{p}> ?o . OPTIONAL {{ ?o rdfs:label ?oLabel . }} }}"
+    else:
+        q = f"{PREFIXES} SELECT ?s ?sLabel WHERE {{ ?s <{p}> <{u}> . OPTIONAL {{ ?s rdfs:label ?sLabel . }} }}"
+    assert _rows(g.one_hop(u, p, direct)) == _rows(g.execute_query(q))
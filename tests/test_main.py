@@ -0,0 +1,54 @@
+import multiprocessing
+
+import faiss
+
+from agent.config import Config
+from app import main
+
+from conftest import RDFS_LABEL, WD, WDT, write_embeddings
+
+# Above faiss's row threshold for running normalize_L2 on OpenMP threads
+N_ENTITIES = 20_000
+
+
+def test_preloaded_components_search_after_fork(tmp_path, monkeypatch):
+    data = tmp_path / "dataset"
+    data.mkdir()
+    (data / "graph.nt").write_text(
+        f'<{WD}Q1> <{WDT}P57> <{WD}Q2> .\n'
+        f'<{WD}Q1> <{RDFS_LABEL}> "Fargo"@en .\n'
+    )
+    emb_paths = write_embeddings(data, N_ENTITIES)
+
+    class DatasetConfig(Config):
+        def __init__(self):
+            super().__init__()
+            for name, path in emb_paths.items():
+                setattr(self, name, path)
+            self.metadata_dir = tmp_path / "metadata"
+            self.embed_quantizer = None
+
+    monkeypatch.setenv("DATA_DIR", str(data))
+    monkeypatch.setattr(main, "Config", DatasetConfig)
+    monkeypatch.setattr(main, "comps", main._Components())
+
+    threads = faiss.omp_get_max_threads()
+    faiss.omp_set_num_threads(4)
+    try:
+        # As PRELOAD_COMPONENTS=1 does before the server forks its workers
+        main.build_components(shared=True)
+        emb = main.comps.qa.emb
+
+        def search():
+            assert emb.get_nearest_neighbors(f"{WD}Q1", k=3)
+            assert emb.predict_tail(f"{WD}Q1", f"{WDT}P57", k=3)
+
+        worker = multiprocessing.get_context("fork").Process(target=search)
+        worker.start()
+        worker.join(60)
+        if worker.is_alive():
+            worker.kill()
+            worker.join()
+        assert worker.exitcode == 0
+    finally:
+        faiss.omp_set_num_threads(threads)
@@ -0,0 +1,50 @@
+import pytest
+from rdflib import Literal
+
+from agent.constants import PREDICATE_MAP
+from agent.nlq import MAX_ANSWERS, _dedup_and_join, _find_predicate
+
+
+def _longest_phrase_scan(q_lower):
+    """The per-call scan _find_predicate replaced: longest phrase first, PREDICATE_MAP order on ties."""
+    for k in sorted(PREDICATE_MAP, key=len, reverse=True):
+        if k in q_lower:
+            return PREDICATE_MAP[k]
+    return None
+
+
+@pytest.mark.parametrize("question", [
+    "who is the director of good will hunting?",
+    "who directed the matrix?",
+    "what is the mpaa rating of fargo?",
+    "what is the country of origin of amélie?",
+    "when did star wars come out?",
+    "which awards were the cast nominated for?",
+    "who is the screenwriter and composer of jaws?",
+    "what languages is it spoken in?",
+    "tell me something",
+    "",
+])
+def test_find_predicate_matches_longest_phrase_scan(question):
+    assert _find_predicate(question) == _longest_phrase_scan(question)
+
+
+def test_find_predicate_prefers_longest_overlapping_phrase():
+    # "rating" starts later inside "mpaa rating"; both must be seen
+    assert _find_predicate("the mpaa rating") == PREDICATE_MAP["mpaa rating"]
+
+
+def test_dedup_and_join_keeps_first_seen_order():
+    vals = ["Joel Coen", "Ethan Coen", "joel coen", " Ethan Coen ", ""]
+    assert _dedup_and_join(vals) == "Joel Coen, Ethan Coen"
+
+
+def test_dedup_and_join_merges_casefolded_variants_keeping_longer_spelling():
+    # "STRASSE" casefolds like "Straße" but is longer, so it wins the slot
+    assert _dedup_and_join(["Straße", "Berlin", "STRASSE"]) == "STRASSE, Berlin"
+
+
+def test_dedup_and_join_stringifies_and_limits():
+    vals = [Literal(f"199{i}") for i in range(MAX_ANSWERS)] + [Literal("1990"), Literal("2001")]
+    assert _dedup_and_join(vals) == ", ".join(f"199{i}" for i in range(MAX_ANSWERS))
+    assert _dedup_and_join(vals, limit=2) == "1990, 1991"
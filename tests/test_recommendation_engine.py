@@ -0,0 +1,39 @@
+import pytest
+
+from agent.composer import Composer
+from agent.graph_executor import GraphExecutor
+from agent.recommendation_engine import RecommendationEngine
+
+from conftest import WD, WDT
+
+RATING = "http://ddis.ch/atai/rating"
+XSD_DECIMAL = "http://www.w3.org/2001/XMLSchema#decimal"
+
+
+def _film(q, *props):
+    lines = [f"<{WD}{q}> <{WDT}P31> <{WD}Q11424> ."]
+    lines += [f"<{WD}{q}> <{WDT}{p}> <{WD}{o}> ." for p, o in props]
+    return lines
+
+
+@pytest.fixture
+def engine(tmp_path, backend):
+    japanese, takemitsu = ("P364", "Q5287"), ("P86", "Q155467")
+    lines = (
+        _film("Q1", japanese)  # seeds
+        + _film("Q2", takemitsu)
+        + _film("Q3", japanese, takemitsu)
+        + _film("Q4", japanese)
+        + _film("Q5")
+        + [f'<{WD}Q4> <{RATING}> "9.0"^^<{XSD_DECIMAL}> .',
+           f"<{WD}Q6> <{WDT}P364> <{WD}Q5287> ."]  # not a film
+    )
+    path = tmp_path / "graph.nt"
+    path.write_text("\n".join(lines) + "\n")
+    return RecommendationEngine(GraphExecutor(path), None, None, None, Composer())
+
+
+def test_japanese_or_takemitsu_excludes_seeds(engine):
+    recs = engine._japanese_language_or_takemitsu_rec([f"{WD}Q1", f"{WD}Q2"])
+    # Matching both attributes ranks first, then by rating
+    assert recs == [f"{WD}Q3", f"{WD}Q4"]